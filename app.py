@@ -5,112 +5,566 @@ Lancement : streamlit run streamlit_persee.py
 """
 
 import streamlit as st
-import urllib.request
-import xml.etree.ElementTree as ET
-import csv
+import requests
+from lxml import etree
 import time
-import json
+import orjson
 import io
+import statistics
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import uuid
 import pandas as pd
-from datetime import datetime
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+
+from persee_parse import NS, XML_PARSER, parse_dc, parse_record
 
 # ─── CONFIG ───────────────────────────────────────────────────────────────────
 
 OAI_BASE = "http://oai.persee.fr/oai"
 
-NS = {
-    "oai":    "http://www.openarchives.org/OAI/2.0/",
-    "dc":     "http://purl.org/dc/elements/1.1/",
-    "oai_dc": "http://www.openarchives.org/OAI/2.0/oai_dc/",
-}
-
 FIELDNAMES = [
     "url_persee", "titre", "auteur", "date", "description",
     "sujet", "type", "source", "langue", "relation",
     "couverture", "editeur", "set_name", "identifier_oai",
 ]
 
-# ─── HELPERS ──────────────────────────────────────────────────────────────────
+# Tags en notation Clark pour iterparse
+_OAI_SET    = f"{{{NS['oai']}}}set"
+_OAI_HEADER = f"{{{NS['oai']}}}header"
+_OAI_IDENT  = f"{{{NS['oai']}}}identifier"
+_OAI_STAMP  = f"{{{NS['oai']}}}datestamp"
+_OAI_RECORD = f"{{{NS['oai']}}}record"
+_OAI_TOKEN  = f"{{{NS['oai']}}}resumptionToken"
+_OAI_ERROR  = f"{{{NS['oai']}}}error"
+
+# Curseurs de harvest incrémental : dernier datestamp par set
+CURSOR_DIR = Path(".persee_cursor")
+
+# Granularité OAI (verbe Identify) → format strftime du paramètre `from`
+_FROM_FORMATS = {
+    "YYYY-MM-DD":           "%Y-%m-%d",
+    "YYYY-MM-DDThh:mm:ssZ": "%Y-%m-%dT%H:%M:%SZ",
+}
+
+# L'aperçu live s'arrête après ce nombre de lignes envoyées au navigateur
+PREVIEW_ROWS = 200
 
-def fetch_xml(url, delay=1.0):
-    time.sleep(delay)
-    req = urllib.request.Request(url, headers={"User-Agent": "PerseeHarvester-Streamlit/1.0"})
-    with urllib.request.urlopen(req, timeout=30) as r:
-        return ET.fromstring(r.read())
+# Les notices sont écrites sur disque (parquet) par lots de cette taille
+BATCH_SIZE = 500
+
+# Dossiers de harvest (un par session) ; ceux non modifiés depuis
+# HARVEST_MAX_AGE secondes sont supprimés (onglets fermés, serveur arrêté)
+HARVEST_ROOT = Path(tempfile.gettempdir()) / "persee_harvests"
+HARVEST_MAX_AGE = 24 * 3600
+
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+# Processus dédiés au parsing XML des GetRecord (CPU, hors GIL)
+PARSE_WORKERS = min(4, os.cpu_count() or 1)
+
+# ─── HELPERS ──────────────────────────────────────────────────────────────────
 
-def list_sets(prefix="ephe"):
+# Streamlit ré-exécute le script à chaque interaction et pour chaque session :
+# les ressources réseau sont créées une seule fois via st.cache_resource et
+# partagées par tous les reruns et tous les onglets
+
+# Connexions HTTP simultanées : pool de l'adapter = pool des tentatives hedgées
+HTTP_POOL_SIZE = 32
+
+# Statuts « serveur saturé » : réessayés à la main (voir _get) pour que le
+# hedging sache quand le serveur demande de ralentir
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+STATUS_RETRIES = 3
+
+# Session partagée : keep-alive + gzip, pool dimensionné pour les workers
+@st.cache_resource
+def _make_session():
+    session = requests.Session()
+    session.headers.update({
+        "User-Agent": "PerseeHarvester-Streamlit/1.0",
+        "Accept-Encoding": "gzip, deflate",
+    })
+    # Retries au niveau connexion uniquement ; les statuts sont gérés par _get.
+    # status=0 + respect_retry_after_header=False : sans cela urllib3 réessaie
+    # lui-même les 413/429/503 porteurs de Retry-After, sans que _get le voie
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE,
+        max_retries=Retry(
+            total=3, connect=3, read=3, status=0,
+            respect_retry_after_header=False, raise_on_status=False,
+            backoff_factor=0.5,
+        ),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+_SESSION = _make_session()
+
+class TokenBucket:
+    """Limiteur de débit partagé entre threads : `rate` requêtes/s au plus.
+
+    Avec `parent`, chaque jeton est aussi pris dans le bucket parent : le
+    débit effectif est le plus bas des deux.
+    """
+
+    def __init__(self, rate, capacity=1.0, parent=None):
+        self.rate = rate
+        self.capacity = capacity
+        self.parent = parent
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate):
+        with self._lock:
+            self.rate = rate
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                wait_s = (1 - self._tokens) / self.rate
+            time.sleep(wait_s)
+        if self.parent is not None:
+            self.parent.acquire()
+
+# Plafond côté serveur, commun à toutes les sessions (req/s vers Persée) ;
+# chaque session a en plus son propre bucket, réglé depuis la sidebar
+GLOBAL_RATE = 16.0
+
+@st.cache_resource
+def _make_global_bucket():
+    return TokenBucket(rate=GLOBAL_RATE)
+
+_GLOBAL_BUCKET = _make_global_bucket()
+
+# Requêtes « hedgées » : une seconde tentative part si la première dépasse
+# HEDGE_FACTOR × la latence médiane récente ; la première réponse l'emporte.
+# Après un statut de saturation, plus de hedging pendant HEDGE_COOLDOWN s.
+HEDGE_FACTOR = 1.5
+HEDGE_MIN_SAMPLES = 10
+HEDGE_COOLDOWN = 60.0
+
+class LatencyStats:
+    """Latences récentes et fenêtre de backoff, partagées entre threads."""
+
+    def __init__(self, maxlen=200):
+        self._samples = deque(maxlen=maxlen)
+        self._backoff_until = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency):
+        with self._lock:
+            self._samples.append(latency)
+
+    def back_off(self, seconds):
+        with self._lock:
+            self._backoff_until = max(self._backoff_until, time.monotonic() + seconds)
+
+    def hedge_after(self):
+        """Délai avant tentative de secours, ou None si pas de hedging."""
+        with self._lock:
+            if time.monotonic() < self._backoff_until or len(self._samples) < HEDGE_MIN_SAMPLES:
+                return None
+            return HEDGE_FACTOR * statistics.median(self._samples)
+
+@st.cache_resource
+def _make_hedge_pool():
+    return ThreadPoolExecutor(max_workers=HTTP_POOL_SIZE)
+
+@st.cache_resource
+def _make_latency_stats():
+    return LatencyStats()
+
+_HEDGE_POOL = _make_hedge_pool()
+_LATENCY = _make_latency_stats()
+
+def _retry_pause(resp, attempt):
+    try:
+        return float(resp.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return 0.5 * 2 ** attempt
+
+def _get(url, bucket):
+    for attempt in range(STATUS_RETRIES + 1):
+        start = time.monotonic()
+        resp = _SESSION.get(url, timeout=30)
+        if resp.status_code not in RETRY_STATUSES or attempt == STATUS_RETRIES:
+            break
+        # Serveur saturé : on attend, sans hedging, et le retry repasse par le budget
+        pause = _retry_pause(resp, attempt)
+        _LATENCY.back_off(pause + HEDGE_COOLDOWN)
+        time.sleep(pause)
+        bucket.acquire()
+    resp.raise_for_status()
+    _LATENCY.record(time.monotonic() - start)
+    return resp.content
+
+def hedged_get(url, bucket):
+    started = threading.Event()
+
+    def first_attempt():
+        started.set()
+        return _get(url, bucket)
+
+    first = _HEDGE_POOL.submit(first_attempt)
+    timeout = _LATENCY.hedge_after()
+    if timeout is None:
+        return first.result()
+    # Le pool est partagé par toutes les sessions : l'attente d'un thread
+    # libre ne compte pas dans le délai de hedging
+    started.wait()
+    done, _ = wait([first], timeout=timeout)
+    # Lente parce qu'en backoff sur un 429/5xx : pas de seconde requête
+    if done or _LATENCY.hedge_after() is None:
+        return first.result()
+
+    # La tentative de secours consomme aussi un jeton du budget
+    bucket.acquire()
+    pending = [first, _HEDGE_POOL.submit(_get, url, bucket)]
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            pending.remove(fut)
+            if fut.exception() is None:
+                for loser in pending:
+                    loser.cancel()
+                return fut.result()
+    return first.result()  # les deux ont échoué : on remonte la première erreur
+
+def fetch_xml(url, bucket, raw=False):
+    """GET limité par `bucket` (celui de la session, plafonné par le global)."""
+    bucket.acquire()
+    data = hedged_get(url, bucket)
+    return data if raw else etree.fromstring(data, parser=XML_PARSER)
+
+def iter_elements(data, *tags):
+    """Parcourt `data` en streaming et libère chaque élément après usage."""
+    for _, elem in etree.iterparse(io.BytesIO(data), events=("end",), tag=tags):
+        yield elem
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+class OAIError(Exception):
+    """Réponse OAI-PMH contenant un élément <error> (hors noRecordsMatch)."""
+
+def raise_for_oai_error(code, message=""):
+    # noRecordsMatch = liste vide légitime (ex. rien de modifié depuis `from`)
+    if code and code != "noRecordsMatch":
+        raise OAIError(f"{code} : {message.strip()}" if message and message.strip() else code)
+
+class IdentifierTarget:
+    """Cible de parsing lxml : ne retient que les couples (identifiant, datestamp)
+    des en-têtes et le resumptionToken.
+
+    Aucun élément n'est construit ; tout le reste de la page est ignoré
+    au niveau des callbacks du parser.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.token = None
+        self.error = None
+        self._deleted = False
+        self._ident = None
+        self._stamp = ""
+        self._text = None
+
+    def start(self, tag, attrib):
+        if tag == _OAI_HEADER:
+            self._deleted = attrib.get("status") == "deleted"
+            self._ident = None
+            self._stamp = ""
+        elif tag == _OAI_ERROR:
+            self.error = (attrib.get("code", ""), "")
+            self._text = []
+        elif tag in (_OAI_IDENT, _OAI_STAMP, _OAI_TOKEN):
+            self._text = []
+
+    def data(self, data):
+        if self._text is not None:
+            self._text.append(data)
+
+    def end(self, tag):
+        if tag == _OAI_HEADER:
+            if self._ident and not self._deleted:
+                self.ids.append((self._ident, self._stamp))
+            return
+        if self._text is None:
+            return
+        if tag == _OAI_IDENT:
+            self._ident = "".join(self._text).strip()
+        elif tag == _OAI_STAMP:
+            self._stamp = "".join(self._text).strip()
+        elif tag == _OAI_TOKEN:
+            self.token = "".join(self._text)
+        elif tag == _OAI_ERROR:
+            self.error = (self.error[0], "".join(self._text))
+        else:
+            return
+        self._text = None
+
+    def close(self):
+        return self.ids, self.token
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def list_sets(prefix, _bucket):
     url = f"{OAI_BASE}?verb=ListSets"
     sets = []
     while url:
-        root = fetch_xml(url, delay=0.5)
-        for s in root.findall(".//oai:set", NS):
-            sid  = s.findtext("oai:setSpec",  namespaces=NS, default="")
-            name = s.findtext("oai:setName",  namespaces=NS, default="")
+        data = fetch_xml(url, _bucket, raw=True)
+        token = None
+        for elem in iter_elements(data, _OAI_SET, _OAI_TOKEN):
+            if elem.tag == _OAI_TOKEN:
+                token = elem.text
+                continue
+            sid  = elem.findtext("oai:setSpec",  namespaces=NS, default="")
+            name = elem.findtext("oai:setName",  namespaces=NS, default="")
             if prefix.lower() in sid.lower() or prefix.lower() in name.lower():
                 sets.append({"id": sid, "name": name})
-        token = root.findtext(".//oai:resumptionToken", namespaces=NS)
         url = f"{OAI_BASE}?verb=ListSets&resumptionToken={token}" if token and token.strip() else None
     return sets
 
-def list_identifiers(set_id, delay=1.0):
+@st.cache_data(ttl=24 * 3600, show_spinner=False)
+def get_from_format(_bucket):
+    """Format du paramètre `from` selon la granularité annoncée par Identify."""
+    root = fetch_xml(f"{OAI_BASE}?verb=Identify", _bucket)
+    granularity = root.findtext(".//oai:granularity", namespaces=NS, default="")
+    return _FROM_FORMATS.get(granularity.strip(), _FROM_FORMATS["YYYY-MM-DD"])
+
+def safe_name(text):
+    """Réduit `text` à un nom de fichier sûr (alphanumériques, - et _)."""
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in text)
+
+def cursor_path(set_id):
+    return CURSOR_DIR / f"{safe_name(set_id)}.txt"
+
+def read_cursor(set_id):
+    path = cursor_path(set_id)
+    if not path.exists():
+        return None
+    return path.read_text(encoding="utf-8").strip() or None
+
+def write_cursor(set_id, stamp):
+    CURSOR_DIR.mkdir(exist_ok=True)
+    cursor_path(set_id).write_text(stamp, encoding="utf-8")
+
+def list_identifiers(set_id, bucket, since=None):
+    """Couples (identifiant, datestamp) des notices non supprimées du set."""
     url = f"{OAI_BASE}?verb=ListIdentifiers&metadataPrefix=oai_dc&set={set_id}"
-    ids = []
+    if since:
+        url += f"&from={since}"
     while url:
-        root = fetch_xml(url, delay=delay)
-        for h in root.findall(".//oai:header", NS):
-            if h.get("status") == "deleted":
-                continue
-            ident = h.findtext("oai:identifier", namespaces=NS, default="")
-            if ident:
-                ids.append(ident)
-        token = root.findtext(".//oai:resumptionToken", namespaces=NS)
+        data = fetch_xml(url, bucket, raw=True)
+        target = IdentifierTarget()
+        parser = etree.XMLParser(target=target)
+        parser.feed(data)
+        ids, token = parser.close()
+        if target.error:
+            raise_for_oai_error(*target.error)
+        yield from ids
         url = f"{OAI_BASE}?verb=ListIdentifiers&resumptionToken={token.strip()}" if token and token.strip() else None
-    return ids
 
-def get_record(identifier, delay=1.0):
+def fetch_record_bytes(identifier, bucket):
     url = f"{OAI_BASE}?verb=GetRecord&metadataPrefix=oai_dc&identifier={identifier}"
-    root = fetch_xml(url, delay=delay)
-    meta = root.find(".//oai_dc:dc", NS)
-    if meta is None:
-        return None
-
-    def all_text(tag):
-        return " | ".join(e.text.strip() for e in meta.findall(f"dc:{tag}", NS) if e.text)
-    def first_text(tag):
-        el = meta.find(f"dc:{tag}", NS)
-        return el.text.strip() if el is not None and el.text else ""
-
-    persee_url = ""
-    if "persee:article/" in identifier:
-        persee_url = "https://www.persee.fr/doc/" + identifier.split("persee:article/")[-1]
-    elif "persee:issue/" in identifier:
-        persee_url = "https://www.persee.fr/issue/" + identifier.split("persee:issue/")[-1]
-
-    return {
-        "identifier_oai": identifier,
-        "url_persee":     persee_url,
-        "titre":          first_text("title"),
-        "auteur":         all_text("creator"),
-        "date":           first_text("date"),
-        "description":    first_text("description"),
-        "sujet":          all_text("subject"),
-        "type":           first_text("type"),
-        "source":         first_text("source"),
-        "langue":         first_text("language"),
-        "relation":       all_text("relation"),
-        "couverture":     all_text("coverage"),
-        "editeur":        first_text("publisher"),
-    }
-
-def records_to_csv(records):
-    buf = io.StringIO()
-    writer = csv.DictWriter(buf, fieldnames=FIELDNAMES, extrasaction="ignore")
-    writer.writeheader()
-    writer.writerows(records)
-    return buf.getvalue().encode("utf-8-sig")  # utf-8-sig = BOM pour Excel
+    return fetch_xml(url, bucket, raw=True)
+
+class ParsePool:
+    """Processus de parsing partagés, recréés si l'un d'eux meurt.
+
+    Un processus tué (OOM, signal) rend le ProcessPoolExecutor définitivement
+    inutilisable (BrokenProcessPool) : on le remplace et on réessaie une fois.
+    """
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._executor = self._new_executor()
+
+    def _new_executor(self):
+        # "spawn" : pas de fork d'un serveur multi-threadé
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def parse(self, identifier, data):
+        executor = self._executor
+        try:
+            return executor.submit(parse_record, identifier, data).result()
+        except BrokenProcessPool:
+            with self._lock:
+                # Un autre thread a peut-être déjà remplacé le pool
+                if self._executor is executor:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    self._executor = self._new_executor()
+                executor = self._executor
+            return executor.submit(parse_record, identifier, data).result()
+
+# Créé une fois pour toutes, partagé par toutes les sessions
+@st.cache_resource
+def _make_parse_pool():
+    return ParsePool(PARSE_WORKERS)
+
+# Cache long du dict parsé, clé = identifiant + datestamp de l'en-tête : une
+# notice modifiée côté Persée (cas du harvest incrémental) change de clé et
+# est re-téléchargée ; un hit ne repasse ni par le réseau ni par le pool
+@st.cache_data(ttl=24 * 3600, max_entries=50000, show_spinner=False)
+def get_record(identifier, datestamp, _parse_pool, _bucket):
+    """Télécharge dans le thread courant, parse dans un processus du pool."""
+    data = fetch_record_bytes(identifier, _bucket)
+    return _parse_pool.parse(identifier, data)
+
+def list_records(set_id, bucket, since=None):
+    """Notices complètes par pages (ListRecords) — une requête pour N notices."""
+    url = f"{OAI_BASE}?verb=ListRecords&metadataPrefix=oai_dc&set={set_id}"
+    if since:
+        url += f"&from={since}"
+    while url:
+        data = fetch_xml(url, bucket, raw=True)
+        token = None
+        for elem in iter_elements(data, _OAI_RECORD, _OAI_TOKEN, _OAI_ERROR):
+            if elem.tag == _OAI_ERROR:
+                raise_for_oai_error(elem.get("code", ""), elem.text or "")
+                continue
+            if elem.tag == _OAI_TOKEN:
+                token = elem.text
+                continue
+            header = elem.find("oai:header", NS)
+            if header is None or header.get("status") == "deleted":
+                continue
+            ident = header.findtext("oai:identifier", namespaces=NS, default="")
+            meta = elem.find("oai:metadata/oai_dc:dc", NS)
+            if ident and meta is not None:
+                yield parse_dc(ident, meta)
+        url = f"{OAI_BASE}?verb=ListRecords&resumptionToken={token.strip()}" if token and token.strip() else None
+
+# Stockage colonne par colonne (SoA) : les lots passent en table Arrow
+# sans conversion ligne à ligne
+def new_records():
+    return {k: [] for k in FIELDNAMES}
+
+def append_record(records, rec):
+    for k in FIELDNAMES:
+        records[k].append(rec.get(k, ""))
+
+def count_records(records):
+    return len(records["identifier_oai"])
+
+def new_harvest_dir(prefix):
+    path = HARVEST_ROOT / f"{safe_name(prefix)}_{uuid.uuid4().hex[:12]}"
+    path.mkdir(parents=True)
+    return path
+
+def cleanup_stale_harvests(max_age=HARVEST_MAX_AGE):
+    """Supprime les dossiers de harvest non modifiés depuis `max_age` secondes."""
+    if not HARVEST_ROOT.exists():
+        return
+    cutoff = time.time() - max_age
+    for path in HARVEST_ROOT.iterdir():
+        try:
+            if path.is_dir() and path.stat().st_mtime < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
+
+# Nettoyage au démarrage du serveur, une seule fois par processus
+@st.cache_resource
+def _cleanup_on_startup():
+    cleanup_stale_harvests()
+    return True
+
+def harvest_parts(harvest_dir):
+    return sorted(Path(harvest_dir).glob("part-*.parquet"))
+
+def flush_batch(batch, harvest_dir):
+    """Écrit le lot courant dans un nouveau fichier parquet et renvoie un lot vide."""
+    if count_records(batch):
+        part = len(harvest_parts(harvest_dir))
+        pq.write_table(pa.Table.from_pydict(batch), Path(harvest_dir) / f"part-{part:05d}.parquet")
+    return new_records()
+
+class HarvestBuffer:
+    """Lot en mémoire du harvest : aperçu live borné et vidage sur disque."""
+
+    def __init__(self, harvest_dir, cols_show):
+        self.harvest_dir = harvest_dir
+        self.cols_show = cols_show
+        self.batch = new_records()
+        self.harvested = 0
+        self.table = None
+        self._shown = 0
+        self._previewed = 0
+
+    def add(self, rec):
+        """Ajoute un article ; renvoie True quand l'aperçu a été rafraîchi."""
+        append_record(self.batch, rec)
+        self.harvested += 1
+        n = count_records(self.batch)
+        refreshed = False
+        # Aperçu live tous les 10 articles : seules les nouvelles lignes sont
+        # envoyées, et au plus PREVIEW_ROWS au total
+        if n - self._shown >= 10:
+            if self.table is not None and self._previewed < PREVIEW_ROWS:
+                self.table.add_rows(pd.DataFrame({c: self.batch[c][self._shown:] for c in self.cols_show}))
+                self._previewed += n - self._shown
+            self._shown = n
+            refreshed = True
+        if n >= BATCH_SIZE:
+            self.flush()
+        return refreshed
+
+    def flush(self):
+        self.batch = flush_batch(self.batch, self.harvest_dir)
+        self._shown = 0
+
+def read_harvest_table(harvest_dir):
+    return pa.concat_tables([pq.read_table(part) for part in harvest_parts(harvest_dir)])
+
+def load_harvest(harvest_dir):
+    # Chaînes Arrow : mémoire contiguë, filtres et nunique vectorisés
+    return read_harvest_table(harvest_dir).to_pandas(types_mapper=pd.ArrowDtype)
+
+@st.cache_data(ttl=3600, max_entries=4, show_spinner=False)
+def records_to_csv(harvest_dir):
+    # Sérialisé lot par lot depuis le parquet, sans DataFrame complet en mémoire
+    buf = io.BytesIO()
+    buf.write("\ufeff".encode("utf-8"))  # BOM pour Excel
+    header = True
+    for part in harvest_parts(harvest_dir):
+        for batch in pq.ParquetFile(part).iter_batches():
+            # reindex : ordre des colonnes fixe, colonnes en trop ignorées
+            batch.to_pandas().reindex(columns=FIELDNAMES).to_csv(buf, index=False, header=header, encoding="utf-8")
+            header = False
+    return buf.getvalue()
+
+# Clé = répertoire du harvest (unique par run) ; cache borné car chaque
+# entrée contient l'export complet
+@st.cache_data(ttl=3600, max_entries=4, show_spinner=False)
+def records_to_json(harvest_dir):
+    # orjson renvoie directement des octets UTF-8, non échappés
+    return orjson.dumps(read_harvest_table(harvest_dir).to_pylist(), option=orjson.OPT_INDENT_2)
 
 # ─── UI ───────────────────────────────────────────────────────────────────────
 
+_cleanup_on_startup()
+
 st.set_page_config(
     page_title="Persée OAI Harvester",
     page_icon="📚",
@@ -133,13 +587,30 @@ with st.sidebar:
     delay = st.slider(
         "Délai entre requêtes (sec)",
         min_value=0.5, max_value=3.0, value=1.0, step=0.1,
-        help="Plus bas = plus rapide, mais risque de surcharger le serveur"
+        help=(
+            "Harvest complet (ListRecords) : 1 requête / délai. "
+            "Harvest limité (GetRecord) : requêtes parallèles / délai. "
+            f"Dans tous les cas, le serveur plafonne l'ensemble des sessions à {GLOBAL_RATE:g} requêtes/s. "
+            "Plus bas = plus rapide, mais risque de surcharger le serveur"
+        )
+    )
+
+    n_workers = st.slider(
+        "Requêtes parallèles",
+        min_value=1, max_value=32, value=DEFAULT_WORKERS, step=1,
+        help="Nombre de GetRecord simultanés (harvest limité), partageant un même budget de requêtes"
     )
 
     max_records = st.number_input(
         "Limite d'articles (0 = illimité)",
         min_value=0, value=0, step=100,
-        help="Pratique pour tester avant un harvest complet"
+        help="Pratique pour tester avant un harvest complet — sans limite, les notices sont récupérées par lots (ListRecords)"
+    )
+
+    incremental = st.checkbox(
+        "Harvest incrémental",
+        value=False,
+        help="Ne récupère que les notices modifiées depuis le dernier harvest de chaque set. Les résultats et l'export ne contiennent alors que ces notices"
     )
 
     st.divider()
@@ -168,18 +639,25 @@ if "sets" not in st.session_state:
     st.session_state.sets = []
 if "selected_sets" not in st.session_state:
     st.session_state.selected_sets = []
-if "records" not in st.session_state:
-    st.session_state.records = []
+if "harvest_dir" not in st.session_state:
+    st.session_state.harvest_dir = None
+if "results" not in st.session_state:
+    st.session_state.results = None
 if "identifiers" not in st.session_state:
     st.session_state.identifiers = []
+# Budget propre à la session : le réglage d'un onglet n'écrase pas celui des autres
+if "bucket" not in st.session_state:
+    st.session_state.bucket = TokenBucket(rate=1.0, parent=_GLOBAL_BUCKET)
+bucket = st.session_state.bucket
 
 col1, col2 = st.columns([1, 3])
 
 with col1:
     if st.button("🔍 Découvrir les sets", use_container_width=True):
         with st.spinner(f"Recherche des sets contenant « {prefix} »..."):
+            bucket.set_rate(1 / delay)
             try:
-                sets = list_sets(prefix)
+                sets = list_sets(prefix, bucket)
                 st.session_state.sets = sets
                 st.session_state.selected_sets = [s["id"] for s in sets]
                 if sets:
@@ -204,79 +682,162 @@ st.header("2 · Harvest")
 if st.session_state.selected_sets:
     if st.button("🚀 Lancer le harvest", type="primary", use_container_width=False):
 
-        st.session_state.records = []
+        if st.session_state.harvest_dir:
+            shutil.rmtree(st.session_state.harvest_dir, ignore_errors=True)
+        cleanup_stale_harvests()
+        st.session_state.harvest_dir = None
+        st.session_state.results = None
         st.session_state.identifiers = []
         errors = []
 
-        # Collecte des identifiants
-        progress_ids = st.progress(0, text="Collecte des identifiants...")
-        status_ids   = st.empty()
-        all_ids = []
-
-        for i, set_id in enumerate(st.session_state.selected_sets):
-            set_name = next((s["name"] for s in st.session_state.sets if s["id"] == set_id), set_id)
-            status_ids.info(f"Identifiants : {set_name}...")
+        # Dédupliqué à la volée ; le dict garde l'ordre et la première occurrence
+        unique = {}
+        # Lot en mémoire, vidé sur disque tous les BATCH_SIZE articles
+        harvest_dir = new_harvest_dir(prefix)
+        cols_show = ["auteur", "titre", "date", "source"]
+        buffer = HarvestBuffer(harvest_dir, cols_show)
+
+        # Harvest incrémental : `from` = datestamp du dernier harvest réussi du set
+        try:
+            from_format = get_from_format(bucket)
+        except Exception:
+            from_format = _FROM_FORMATS["YYYY-MM-DD"]
+        completed = {}
+
+        if max_records == 0:
+            # Mode bulk : ListRecords renvoie les notices complètes par pages,
+            # sans GetRecord individuel
+            bucket.set_rate(1 / delay)
+            progress_rec  = st.progress(0, text="Récupération des notices par lots...")
+            status_rec    = st.empty()
+            buffer.table  = st.dataframe(pd.DataFrame(columns=cols_show), use_container_width=True)
+            counter       = st.empty()
+
+            for i, set_id in enumerate(st.session_state.selected_sets):
+                set_name = next((s["name"] for s in st.session_state.sets if s["id"] == set_id), set_id)
+                status_rec.info(f"Notices : {set_name}...")
+                since = read_cursor(set_id) if incremental else None
+                started = datetime.now(timezone.utc).strftime(from_format)
+                try:
+                    for rec in list_records(set_id, bucket, since=since):
+                        ident = rec["identifier_oai"]
+                        if ident in unique:
+                            continue
+                        unique[ident] = {"identifier": ident, "set_id": set_id, "set_name": set_name}
+                        rec["set_name"] = set_name
+                        if buffer.add(rec):
+                            counter.caption(f"✓ {buffer.harvested} récupérés")
+                    completed[set_id] = started
+                except Exception as e:
+                    errors.append({"identifier": set_id, "error": str(e)})
+                    st.warning(f"Erreur sur {set_id} : {e}")
+                n_sets = len(st.session_state.selected_sets)
+                progress_rec.progress((i + 1) / n_sets, text=f"{i+1}/{n_sets} séries")
+
+            st.session_state.identifiers = list(unique.values())
+
+        else:
+            # Collecte des identifiants : chaque nouvel identifiant est soumis
+            # au pool dès sa lecture, pendant que les pages suivantes arrivent
+            progress_ids = st.progress(0, text="Collecte des identifiants...")
+            status_ids   = st.empty()
+            futures = {}
+            bucket.set_rate(n_workers / delay)
+
+            # Threads pour le réseau, processus (partagés) pour le parsing
+            pp = _make_parse_pool()
+            ex = ThreadPoolExecutor(max_workers=n_workers)
             try:
-                ids = list_identifiers(set_id, delay=delay)
-                for ident in ids:
-                    all_ids.append({"identifier": ident, "set_id": set_id, "set_name": set_name})
-            except Exception as e:
-                st.warning(f"Erreur sur {set_id} : {e}")
-            progress_ids.progress((i + 1) / len(st.session_state.selected_sets))
-
-        # Déduplication
-        seen = set()
-        unique_ids = []
-        for item in all_ids:
-            if item["identifier"] not in seen:
-                seen.add(item["identifier"])
-                unique_ids.append(item)
-
-        st.session_state.identifiers = unique_ids
-        status_ids.success(f"✓ {len(unique_ids)} identifiants uniques collectés")
-
-        # Récupération des métadonnées
-        total = len(unique_ids) if max_records == 0 else min(max_records, len(unique_ids))
-        progress_rec  = st.progress(0, text="Récupération des métadonnées...")
-        status_rec    = st.empty()
-        live_table    = st.empty()
-        counter       = st.empty()
-
-        records = []
-        for i, item in enumerate(unique_ids[:total]):
-            try:
-                rec = get_record(item["identifier"], delay=delay)
-                if rec:
-                    rec["set_name"] = item["set_name"]
-                    records.append(rec)
-            except Exception as e:
-                errors.append({"identifier": item["identifier"], "error": str(e)})
-
-            pct = (i + 1) / total
-            progress_rec.progress(pct, text=f"{i+1}/{total} articles")
-            counter.caption(f"✓ {len(records)} récupérés · ✗ {len(errors)} erreurs")
-
-            # Aperçu live tous les 10 articles
-            if len(records) % 10 == 0 and records:
-                df_preview = pd.DataFrame(records[-10:])
-                cols_show = [c for c in ["auteur", "titre", "date", "source"] if c in df_preview.columns]
-                live_table.dataframe(df_preview[cols_show], use_container_width=True)
-
-        st.session_state.records = records
+                for i, set_id in enumerate(st.session_state.selected_sets):
+                    set_name = next((s["name"] for s in st.session_state.sets if s["id"] == set_id), set_id)
+                    status_ids.info(f"Identifiants : {set_name}...")
+                    since = read_cursor(set_id) if incremental else None
+                    started = datetime.now(timezone.utc).strftime(from_format)
+                    try:
+                        for ident, datestamp in list_identifiers(set_id, bucket, since=since):
+                            if ident in unique:
+                                continue
+                            item = {"identifier": ident, "set_id": set_id, "set_name": set_name}
+                            unique[ident] = item
+                            if len(futures) < max_records:
+                                futures[ex.submit(get_record, ident, datestamp, pp, bucket)] = item
+                        completed[set_id] = started
+                    except Exception as e:
+                        st.warning(f"Erreur sur {set_id} : {e}")
+                    progress_ids.progress((i + 1) / len(st.session_state.selected_sets))
+
+                unique_ids = list(unique.values())
+
+                st.session_state.identifiers = unique_ids
+                status_ids.success(f"✓ {len(unique_ids)} identifiants uniques collectés")
+
+                # Récupération des métadonnées
+                total = len(futures)
+                progress_rec  = st.progress(0, text="Récupération des métadonnées...")
+                status_rec    = st.empty()
+                buffer.table  = st.dataframe(pd.DataFrame(columns=cols_show), use_container_width=True)
+                counter       = st.empty()
+
+                for i, fut in enumerate(as_completed(futures)):
+                    item = futures[fut]
+                    try:
+                        rec = fut.result()
+                        if rec:
+                            rec["set_name"] = item["set_name"]
+                            buffer.add(rec)
+                    except Exception as e:
+                        errors.append({"identifier": item["identifier"], "error": str(e)})
+                        completed.pop(item["set_id"], None)
+
+                    # Écritures websocket limitées à une toutes les 5 itérations
+                    if i % 5 == 0 or i + 1 == total:
+                        pct = (i + 1) / total
+                        progress_rec.progress(pct, text=f"{i+1}/{total} articles")
+                        counter.caption(f"✓ {buffer.harvested} récupérés · ✗ {len(errors)} erreurs")
+            finally:
+                # Stop/rerun Streamlit (exception levée dans le script) : les
+                # GetRecord en file sont annulés au lieu d'être attendus
+                ex.shutdown(wait=False, cancel_futures=True)
+
+            # Harvest tronqué par la limite : le curseur ne doit pas avancer
+            if len(unique) > max_records:
+                completed.clear()
+
+        # Données sur disque d'abord : un échec d'écriture ne doit pas avancer le curseur
+        buffer.flush()
+        for set_id, stamp in completed.items():
+            write_cursor(set_id, stamp)
+
+        if buffer.harvested:
+            st.session_state.harvest_dir = str(harvest_dir)
+            # Chargé une fois ici, pas à chaque rerun (frappe dans un filtre, etc.)
+            st.session_state.results = load_harvest(harvest_dir)
+        else:
+            shutil.rmtree(harvest_dir, ignore_errors=True)
         progress_rec.progress(1.0, text="Harvest terminé ✓")
-        status_rec.success(f"✓ {len(records)} articles récupérés · {len(errors)} erreurs")
+        status_rec.success(f"✓ {buffer.harvested} articles récupérés · {len(errors)} erreurs")
 
 # ── Étape 3 : Résultats & Export ──────────────────────────────────────────────
-if st.session_state.records:
+# Dossier supprimé entre-temps (nettoyage des harvests périmés) : résultats perdus
+if st.session_state.harvest_dir and not Path(st.session_state.harvest_dir).exists():
+    st.session_state.harvest_dir = None
+    st.session_state.results = None
+
+if st.session_state.harvest_dir:
     st.header("3 · Résultats & Export")
 
-    df = pd.DataFrame(st.session_state.records)
+    df = st.session_state.results
+
+    # Année = 4 premiers chiffres de la date, extraits par les kernels Arrow ;
+    # la colonne exportée reste intacte
+    dates = df["date"]
+    years = dates[dates.str.match(r"\d{4}", na=False)].str.slice(0, 4).astype("int64[pyarrow]")
 
     # Stats rapides
     c1, c2, c3, c4 = st.columns(4)
     c1.metric("Articles", len(df))
     c2.metric("Auteurs uniques", df["auteur"].nunique() if "auteur" in df else "—")
-    c3.metric("Période", f"{df['date'].min()} – {df['date'].max()}" if "date" in df else "—")
+    c3.metric("Période", f"{years.min()} – {years.max()}" if len(years) else "—")
     c4.metric("Sets", df["set_name"].nunique() if "set_name" in df else "—")
 
     # Filtres rapides
@@ -287,15 +848,15 @@ if st.session_state.records:
         with col_f2:
             filter_mot    = st.text_input("Filtrer par mot-clé (titre ou sujet)")
 
-        df_filtered = df.copy()
+        mask = pd.Series(True, index=df.index)
         if filter_auteur:
-            df_filtered = df_filtered[df_filtered["auteur"].str.contains(filter_auteur, case=False, na=False)]
+            mask &= df["auteur"].str.contains(filter_auteur, case=False, na=False)
         if filter_mot:
-            mask = (
-                df_filtered["titre"].str.contains(filter_mot, case=False, na=False) |
-                df_filtered["sujet"].str.contains(filter_mot, case=False, na=False)
-            )
-            df_filtered = df_filtered[mask]
+            # Titre et sujet concaténés (séparateur \x1f) : une seule passe,
+            # recherche littérale → match_substring d'Arrow sans regex
+            haystack = df["titre"] + "\x1f" + df["sujet"]
+            mask &= haystack.str.contains(filter_mot, case=False, regex=False, na=False)
+        df_filtered = df[mask]
         st.caption(f"{len(df_filtered)} résultats après filtrage")
 
     # Tableau complet
@@ -315,7 +876,7 @@ if st.session_state.records:
     col_e1, col_e2 = st.columns(2)
 
     with col_e1:
-        csv_data = records_to_csv(st.session_state.records)
+        csv_data = records_to_csv(st.session_state.harvest_dir)
         st.download_button(
             label="⬇️ Télécharger CSV (Airtable-ready)",
             data=csv_data,
@@ -326,7 +887,7 @@ if st.session_state.records:
         )
 
     with col_e2:
-        json_data = json.dumps(st.session_state.records, ensure_ascii=False, indent=2).encode("utf-8")
+        json_data = records_to_json(st.session_state.harvest_dir)
         st.download_button(
             label="⬇️ Télécharger JSON",
             data=json_data,
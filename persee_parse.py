@@ -0,0 +1,76 @@
+"""
+Parsing des notices Dublin Core (oai_dc) de Persée.
+
+Module séparé de l'application Streamlit pour être importable par les
+processus du pool de parsing.
+"""
+
+from collections import defaultdict
+
+from lxml import etree
+
+NS = {
+    "oai":    "http://www.openarchives.org/OAI/2.0/",
+    "dc":     "http://purl.org/dc/elements/1.1/",
+    "oai_dc": "http://www.openarchives.org/OAI/2.0/oai_dc/",
+}
+
+XML_PARSER = etree.XMLParser(huge_tree=False, recover=False)
+
+# XPath compilé une fois au chargement du module
+_XP_DC = etree.XPath("//oai_dc:dc", namespaces=NS)
+
+# Tag Clark dc:* → nom local, résolu une fois pour toutes
+_DC_TAGS = {
+    f"{{{NS['dc']}}}{tag}": tag
+    for tag in ("title", "creator", "date", "description", "subject", "type",
+                "source", "language", "relation", "coverage", "publisher")
+}
+
+_ARTICLE_MARK = "persee:article/"
+_ISSUE_MARK   = "persee:issue/"
+
+def parse_record(identifier, data):
+    """Réponse GetRecord brute → dict de notice (None si pas de oai_dc:dc)."""
+    found = _XP_DC(etree.fromstring(data, parser=XML_PARSER))
+    if not found:
+        return None
+    return parse_dc(identifier, found[0])
+
+def parse_dc(identifier, meta):
+    # oai_dc:dc est plat : un seul passage sur ses enfants directs
+    buckets = defaultdict(list)
+    for el in meta:
+        tag = _DC_TAGS.get(el.tag)
+        if tag and el.text:
+            buckets[tag].append(el.text.strip())
+
+    def all_text(tag):
+        return " | ".join(buckets[tag])
+    def first_text(tag):
+        return buckets[tag][0] if buckets[tag] else ""
+
+    persee_url = ""
+    _, sep, tail = identifier.partition(_ARTICLE_MARK)
+    if sep:
+        persee_url = "https://www.persee.fr/doc/" + tail
+    else:
+        _, sep, tail = identifier.partition(_ISSUE_MARK)
+        if sep:
+            persee_url = "https://www.persee.fr/issue/" + tail
+
+    return {
+        "identifier_oai": identifier,
+        "url_persee":     persee_url,
+        "titre":          first_text("title"),
+        "auteur":         all_text("creator"),
+        "date":           first_text("date"),
+        "description":    first_text("description"),
+        "sujet":          all_text("subject"),
+        "type":           first_text("type"),
+        "source":         first_text("source"),
+        "langue":         first_text("language"),
+        "relation":       all_text("relation"),
+        "couverture":     all_text("coverage"),
+        "editeur":        first_text("publisher"),
+    }